@@ -1,7 +1,10 @@
 import argparse
 import curses
+import os
+import shutil
 from multiprocessing import set_start_method
 from pathlib import Path
+from tempfile import NamedTemporaryFile
 
 from tjex import tjex
 from tjex.curses_helper import DummyRegion
@@ -28,21 +31,21 @@ def main(readme: Path | None):
         print(table)
         return
 
-    readme_lines = iter(readme.read_text().splitlines())
+    text = readme.read_text()
+    # Keep everything up to and including the "## Hotkeys" line and from the next
+    # section header on
+    head_end = text.index("\n", text.index("\n## Hotkeys") + 1) + 1
+    tail_start = text.index("\n## ", head_end - 1) + 1
 
-    with open(readme, "w") as f:
-        for l in readme_lines:
-            print(l, file=f)
-            if l.startswith("## Hotkeys"):
-                break
+    with NamedTemporaryFile(
+        mode="w", dir=readme.parent, delete_on_close=False, delete=True
+    ) as f:
+        _ = f.write(text[:head_end])
         print(table, file=f)
-        while not (l := next(readme_lines)).startswith("## "):
-            pass
-        print(l, file=f)
-        for l in readme_lines:
-            print(l, file=f)
-
-    readme_lines = readme and iter(readme.read_text().splitlines())
+        _ = f.write(text[tail_start:])
+        f.close()
+        shutil.copymode(readme, f.name)
+        os.replace(f.name, readme)
 
 
 if __name__ == "__main__":
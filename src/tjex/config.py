@@ -1,7 +1,7 @@
 import json
 import re
 import subprocess as sp
-import tomllib
+import sys
 from base64 import b64encode
 from dataclasses import asdict, dataclass, field
 from pathlib import Path
@@ -10,7 +10,7 @@ from typing import Any, TypeVar
 
 from tjex.curses_helper import KEY_ALIASES
 from tjex.panel import KeyBindings
-from tjex.utils import TjexError
+from tjex.utils import TjexError, shell_args
 
 
 class ConfigError(TjexError):
@@ -54,20 +54,16 @@ class Config:
 
     def do_copy(self, s: str):
         if self.copy_command is None:
-            print(
-                "\033]52;c;{}\a".format(b64encode(s.encode()).decode()),
-                end="",
-                flush=True,
-            )
+            _ = sys.stdout.buffer.write(b"\033]52;c;" + b64encode(s.encode()) + b"\a")
+            _ = sys.stdout.buffer.flush()
         else:
             result = sp.run(
-                ["bash", "-c", self.copy_command],
-                input=s + "\n",
+                shell_args(self.copy_command),
+                input=(s + "\n").encode(),
                 capture_output=True,
-                text=True,
             )
             if result.returncode != 0:
-                raise ConfigError(result.stderr)
+                raise ConfigError(result.stderr.decode(errors="replace"))
 
 
 config: Config = Config()
@@ -108,10 +104,11 @@ def make_example_config(bindings: dict[str, KeyBindings[Any, Any]]):
 
 def apply_bindings(bindings: dict[str, KeyBindings[Any, Any]]):
     for panel, b in config.bindings.items():
+        functions = {_f.name: _f for _f in bindings[panel].functions}
         for k, f in b.items():
-            bindings[panel].bindings[KEY_ALIASES.get(k, k)] = next(
-                _f for _f in bindings[panel].functions if _f.name == f
-            )
+            if f not in functions:
+                raise ConfigError(f"Unknown function {f!r} in bindings.{panel}")
+            bindings[panel].bindings[KEY_ALIASES.get(k, k)] = functions[f]
 
 
 def load(config_dict: Any, bindings: dict[str, KeyBindings[Any, Any]]) -> None:
@@ -125,6 +122,9 @@ def load_config_file(
     bindings: dict[str, KeyBindings[Any, Any]],
 ) -> None:
     if config_file.exists():
+        # Imported here, because the jq worker processes import this module too
+        import tomllib
+
         with open(config_file, "rb") as f:
             load(tomllib.load(f), bindings)
     else:
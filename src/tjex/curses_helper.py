@@ -1,8 +1,13 @@
 from __future__ import annotations
 
 import curses
+import logging
+import os
+import select
+import sys
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, replace
+from functools import lru_cache
 from typing import override
 
 from tjex.logging import logger
@@ -37,6 +42,33 @@ KEY_ALIASES = {
 }
 
 
+# Synchronized output (DEC private mode 2026): the terminal holds back
+# rendering until the end marker, so a redraw appears at once.
+# Terminals without support ignore both sequences.
+BEGIN_SYNCHRONIZED_UPDATE = b"\x1b[?2026h"
+END_SYNCHRONIZED_UPDATE = b"\x1b[?2026l"
+
+
+def synchronized_refresh(window: curses.window):
+    """Refresh window, wrapping curses' output in one synchronized update"""
+    fd = sys.stdout.fileno()
+    _ = os.write(fd, BEGIN_SYNCHRONIZED_UPDATE)
+    try:
+        window.refresh()
+    finally:
+        _ = os.write(fd, END_SYNCHRONIZED_UPDATE)
+
+
+@lru_cache(maxsize=512)
+def keyname(code: int) -> str:
+    return curses.keyname(code).decode("utf-8")
+
+
+def wait_readable(fds: list[int], timeout: float):
+    """Wait until one of fds is readable or timeout has passed"""
+    _ = select.select(fds, [], [], timeout)
+
+
 class KeyReader:
     def __init__(self, window: curses.window):
         curses.set_escdelay(10)
@@ -56,13 +88,18 @@ class KeyReader:
                 except curses.error:
                     return "ESC"
             if isinstance(key, int):
-                key = curses.keyname(key).decode("utf-8")
+                key = keyname(key)
             key = prefix + key
-            logger.debug(f"{key=}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"{key=}")
             return key
         except curses.error:
             return None
 
+    def wait(self, fds: list[int], timeout: float):
+        """Wait until a key is pressed, one of fds is readable or timeout has passed"""
+        wait_readable([sys.stdin.fileno(), *fds], timeout)
+
 
 class Region(ABC):
     size: Point = Point.ZERO
@@ -116,9 +153,9 @@ class WindowRegion(Region):
     @override
     def insstr(self, pos: Point, s: str, attr: int = 0):
         if self.height > pos.y >= 0 and self.width > pos.x > -len(s):
-            self.window.insstr(
-                pos.y, max(0, pos.x), s[max(0, -pos.x) : self.width - pos.x], attr
-            )
+            if pos.x < 0 or pos.x + len(s) > self.width:
+                s = s[max(0, -pos.x) : self.width - pos.x]
+            self.window.insstr(pos.y, max(0, pos.x), s, attr)
 
     @override
     def chgat(self, pos: Point, width: int, attr: int):
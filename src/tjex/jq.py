@@ -4,13 +4,23 @@ import importlib.resources
 import json
 import re
 import subprocess as sp
+from collections import OrderedDict
 from dataclasses import dataclass
-from multiprocessing import Process, Queue, get_start_method
+from functools import cache, lru_cache
+from multiprocessing import Pipe, Process, get_start_method
+from multiprocessing.connection import Connection
 from pathlib import Path
-from queue import Empty
+from typing import Never
 
 from tjex.config import Config, config
-from tjex.json_table import Json, TableCell, TableKey, Undefined, json_to_table
+from tjex.json_table import (
+    Json,
+    TableCell,
+    TableKey,
+    Undefined,
+    json_to_table,
+    plain_json_string_pattern,
+)
 from tjex.table import Table
 from tjex.utils import TjexError
 
@@ -25,17 +35,26 @@ class JqError(TjexError):
     pass
 
 
-identifier_pattern = re.compile(r"[a-zA-Z_][a-zA-Z0-9_]*")
+def key_to_json(key: str | int):
+    match key:
+        case int():
+            return str(key)
+        case str() if plain_json_string_pattern.fullmatch(key):
+            return f'"{key}"'
+        case _:
+            return json.dumps(key, ensure_ascii=False)
 
 
+@lru_cache(maxsize=1024)
 def key_to_selector(key: TableKey):
     match key:
         case Undefined():
             return ""
-        case str() if identifier_pattern.fullmatch(key):
+        # The same as matching [a-zA-Z_][a-zA-Z0-9_]*
+        case str() if key.isascii() and key.isidentifier():
             return f".{key}"
         case _:
-            return f"[{json.dumps(key, ensure_ascii=False)}]"
+            return f"[{key_to_json(key)}]"
 
 
 def keys_to_selector(*keys: TableKey):
@@ -48,12 +67,17 @@ selector_pattern = re.compile(
 )
 
 
+# jq builtins whose output doesn't only depend on the input
+nondeterministic_pattern = re.compile(r"\bnow\b")
+
+
 def append_filter(command: str, filter: str):
     if command == "":
         return filter
     return command + " | " + filter
 
 
+@lru_cache(maxsize=1024)
 def standalone_selector(selector: str):
     return ("" if selector.startswith(".") else ".") + selector
 
@@ -61,28 +85,57 @@ def standalone_selector(selector: str):
 def append_selector(command: str, selector: str):
     if command == "":
         return standalone_selector(selector)
-    if selector_pattern.fullmatch(command.split("|")[-1]):
+    if selector_pattern.fullmatch(command.rpartition("|")[2]):
         return command + selector
     return command + " | " + standalone_selector(selector)
 
 
+@cache
+def load_prelude() -> str:
+    return (
+        importlib.resources.files("tjex.resources").joinpath("builtins.jq").read_text()
+    )
+
+
 class Jq:
     command: str | None = None
-    result: Queue[JqResult] | None = None
+    # Receiving end of the pending run's result pipe
+    result: Connection[Never, JqResult] | None = None
     process: Process | None = None
     latest_status: JqResult = JqResult("...", None)
+    # Result for the current command taken from result_cache, not yet returned by status
+    cached_result: JqResult | None = None
+    # Number of results kept for re-evaluating recent commands, e.g. after undo
+    result_cache_size: int = 8
+    # result_cache key for the pending result
+    result_key: tuple[str, tuple[int, ...]] | None = None
 
     def __init__(self, file: list[Path], slurp: bool):
         # The default start_method "fork" breaks curses
         assert get_start_method() == "forkserver"
         self.file: list[Path] = file
         self.extra_args: list[str] = ["--slurp"] if slurp or len(file) > 1 else []
-        self.prelude: str = importlib.resources.read_text(
-            "tjex.resources", "builtins.jq"
+        self.prelude: str = load_prelude()
+        # Terminated processes that have not been joined yet
+        self.stale_processes: list[Process] = []
+        self.result_cache: OrderedDict[tuple[str, tuple[int, ...]], JqResult] = (
+            OrderedDict()
         )
 
+    def jq_args(self, command: str | None) -> list[str | Path]:
+        return [
+            config.jq_command,
+            *self.extra_args,
+            self.prelude + (command or "."),
+            *self.file,
+        ]
+
     @staticmethod
-    def run(command: list[str], result: Queue[JqResult], _config: Config):
+    def run(
+        command: list[str | Path],
+        result: Connection[JqResult, Never],
+        _config: Config,
+    ):
         # Update global config in subprocess
         for k, v in vars(_config).items():
             setattr(config, k, v)
@@ -92,69 +145,122 @@ class Jq:
                 capture_output=True,
             )
             if res.returncode == 0:
-                data: Json = json.loads(res.stdout.decode("utf8"))
+                data: Json = json.loads(res.stdout)
                 if data is None:
-                    result.put(JqResult("null", None))
+                    result.send(JqResult("null", None))
                 else:
-                    result.put(JqResult("", json_to_table(data)))
+                    result.send(JqResult("", json_to_table(data)))
             else:
-                result.put(JqResult(res.stderr.decode("utf8"), None))
+                result.send(JqResult(res.stderr.decode("utf8"), None))
         except BaseException as e:
-            result.put(JqResult(str(e), None))
+            result.send(JqResult(str(e), None))
 
     def update(self, command: str, force: bool = False):
         if force or command != self.command:
             if self.process is not None:
+                # Don't wait for the old process to exit, it is reaped later on.
                 self.process.terminate()
-                self.process.join()
-                self.process.close()
+                self.stale_processes.append(self.process)
+            self.reap_stale_processes()
             if self.result is not None:
                 self.result.close()
-            self.result = Queue()
+            self.result = None
+            self.process = None
+            self.command = command
+
+            self.result_key = None
+            if (
+                nondeterministic_pattern.search(command) is None
+                and (input_version := self.input_version()) is not None
+            ):
+                self.result_key = (command, input_version)
+            if (
+                not force
+                and self.result_key is not None
+                and (cached := self.result_cache.get(self.result_key)) is not None
+            ):
+                self.result_cache.move_to_end(self.result_key)
+                self.cached_result = cached
+                return
+            self.cached_result = None
 
+            self.result, sender = Pipe(duplex=False)
             self.process = Process(
                 target=self.run,
                 args=(
-                    [
-                        config.jq_command,
-                        *self.extra_args,
-                        self.prelude + (command or "."),
-                        *self.file,
-                    ],
-                    self.result,
+                    self.jq_args(command),
+                    sender,
                     config,
                 ),
             )
             self.process.start()
-            self.command = command
+            # Only the worker may keep the sending end open, so that result
+            # becomes readable (at EOF) if the worker dies without a result
+            sender.close()
+
+    def input_version(self) -> tuple[int, ...] | None:
+        """Inode, size and modification time of each input file.
+        None if they can't be determined.
+        """
+        try:
+            return tuple(
+                v
+                for st in map(Path.stat, self.file)
+                for v in (st.st_ino, st.st_size, st.st_mtime_ns)
+            )
+        except OSError:
+            return None
+
+    def wait_fds(self) -> list[int]:
+        """File descriptors that become readable once the pending result is ready"""
+        if self.result is None:
+            return []
+        return [self.result.fileno()]
+
+    def reap_stale_processes(self):
+        for process in [p for p in self.stale_processes if p.exitcode is not None]:
+            process.close()
+            self.stale_processes.remove(process)
 
     def status(self, block: bool = False, timeout: float = 2) -> JqResult | None:
+        self.reap_stale_processes()
+        if self.cached_result is not None:
+            self.latest_status = self.cached_result
+            self.cached_result = None
+            return self.latest_status
         if self.result is None:
             return None
-        try:
-            self.latest_status = self.result.get(block, timeout)
-            if self.process is not None:
-                self.process.join()
-                self.process.close()
-                self.process = None
-            self.result.close()
-            self.result = None
-        except Empty:
+        if not self.result.poll(timeout if block else 0):
             self.latest_status = JqResult("...", None)
+            return self.latest_status
+        try:
+            self.latest_status = self.result.recv()
+            # Errors, e.g. from a killed jq, may not happen again
+            if self.result_key is not None and self.latest_status.table is not None:
+                self.result_cache[self.result_key] = self.latest_status
+                self.result_cache.move_to_end(self.result_key)
+                if len(self.result_cache) > self.result_cache_size:
+                    _ = self.result_cache.popitem(last=False)
+        except EOFError:
+            self.latest_status = JqResult("jq worker exited without a result", None)
+        if self.process is not None:
+            self.process.join()
+            self.process.close()
+            self.process = None
+        self.result.close()
+        self.result = None
         return self.latest_status
 
-    def run_plain(self, command: str | None = None) -> Json:
+    def run_plain(self, command: str | None = None, raw: bool = False) -> str:
+        """Output of command as json.
+        With raw, a string result is returned as plain text instead of a json string.
+        """
         if command is None:
             command = self.command
-        res = sp.run(
-            [
-                config.jq_command,
-                *self.extra_args,
-                self.prelude + (command or "."),
-                *self.file,
-            ],
-            capture_output=True,
-        )
+        res = sp.run(self.jq_args(command), capture_output=True)
         if res.returncode != 0:
             raise JqError(res.stderr.decode("utf8"))
-        return json.loads(res.stdout.decode("utf8"))
+        data: Json = json.loads(res.stdout)
+        if raw and isinstance(data, str):
+            return data
+        return json.dumps(data, ensure_ascii=False)
@@ -1,5 +1,6 @@
 import curses
 import json
+import re
 from abc import ABC
 from collections.abc import Iterable
 from dataclasses import dataclass
@@ -12,6 +13,9 @@ from tjex.curses_helper import Region
 from tjex.point import Point
 from tjex.table import CellFormatter, Table
 
+# Strings that json.dumps(..., ensure_ascii=False) only wraps in quotes
+plain_json_string_pattern = re.compile(r'[^"\\\x00-\x1f]*')
+
 type Json = str | int | float | bool | list[Json] | dict[str, Json] | None
 
 
@@ -20,79 +24,94 @@ class Undefined:
     pass
 
 
+UNDEFINED = Undefined()
+
 type TableKey = str | int | Undefined
 
 
 class TableCell(ABC):
-    pass
+    __slots__: tuple[str, ...] = ()
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class StringCell(TableCell):
     s: str
     color: int | None = None
     fixed_width: bool = False
     attr: int = 0
 
+    # Cells are sent from the jq worker in bulk. Pickling them as constructor
+    # arguments is smaller and faster than the default for slotted dataclasses.
+    @override
+    def __reduce__(self):
+        return (StringCell, (self.s, self.color, self.fixed_width, self.attr))
+
 
-@dataclass
+@dataclass(slots=True)
 class NumberCell(TableCell):
     v: int | float
 
+    # See StringCell.__reduce__
+    @override
+    def __reduce__(self):
+        return (NumberCell, (self.v,))
+
+
+# Cells of constant values are shared. Tables are sent from the jq worker pickled,
+# and pickle sends each shared object only once.
+FALSE_CELL = StringCell("false", curses.COLOR_RED, True)
+TRUE_CELL = StringCell("true", curses.COLOR_GREEN, True)
+EMPTY_STRING_CELL = StringCell('""', attr=curses.A_DIM)
+EMPTY_LIST_CELL = StringCell("[]", curses.COLOR_MAGENTA, True, curses.A_DIM)
+LIST_CELL = StringCell("[…]", curses.COLOR_MAGENTA, True)
+EMPTY_DICT_CELL = StringCell("{}", curses.COLOR_MAGENTA, True, curses.A_DIM)
+DICT_CELL = StringCell("{…}", curses.COLOR_MAGENTA, True)
+NULL_CELL = StringCell("null", curses.COLOR_YELLOW, True, curses.A_DIM)
+UNDEFINED_CELL = StringCell("")
+
 
 def to_table_cell(v: Json | Undefined) -> TableCell:
     match v:
         case False:
-            return StringCell("false", curses.COLOR_RED, True)
+            return FALSE_CELL
         case True:
-            return StringCell("true", curses.COLOR_GREEN, True)
+            return TRUE_CELL
         case float() | int():
             return NumberCell(v)
         case "":
-            return StringCell('""', attr=curses.A_DIM)
+            return EMPTY_STRING_CELL
         case str():
-            encoded = json.dumps(v, ensure_ascii=False)
-            if v != encoded[1:-1]:
-                v = encoded
+            if plain_json_string_pattern.fullmatch(v) is None:
+                v = json.dumps(v, ensure_ascii=False)
             return StringCell(v)
         case []:
-            return StringCell(
-                "[]",
-                curses.COLOR_MAGENTA,
-                True,
-                curses.A_DIM,
-            )
+            return EMPTY_LIST_CELL
         case list():
-            return StringCell("[…]", curses.COLOR_MAGENTA, True)
+            return LIST_CELL
         case dict() if not v:
-            return StringCell(
-                "{}",
-                curses.COLOR_MAGENTA,
-                True,
-                curses.A_DIM,
-            )
+            return EMPTY_DICT_CELL
         case dict():
-            return StringCell("{…}", curses.COLOR_MAGENTA, True)
+            return DICT_CELL
         case None:
-            return StringCell("null", curses.COLOR_YELLOW, True, curses.A_DIM)
+            return NULL_CELL
         case Undefined():
-            return StringCell("")
+            return UNDEFINED_CELL
 
 
 def to_dict(v: Json) -> dict[TableKey, TableCell]:
     match v:
         case list():
             return {
-                Undefined(): to_table_cell(v),
+                UNDEFINED: to_table_cell(v),
                 **{i: to_table_cell(v) for i, v in enumerate(v)},
             }
         case dict():
             return {
-                Undefined(): to_table_cell(v),
+                UNDEFINED: to_table_cell(v),
                 **{k: to_table_cell(v) for k, v in v.items()},
             }
         case _:
-            return {Undefined(): to_table_cell(v)}
+            return {UNDEFINED: to_table_cell(v)}
 
 
 type TableContent = dict[TableKey, dict[TableKey, TableCell]]
@@ -107,7 +126,7 @@ def to_table_content(
         case dict():
             return {k: to_dict(v) for k, v in v.items()}
         case _:
-            return {Undefined(): to_dict(v)}
+            return {UNDEFINED: to_dict(v)}
 
 
 def compare_prefix_len(base: str | None, a: str, b: str):
@@ -166,19 +185,34 @@ def collect_keys(entries: Iterable[Iterable[TableKey]]):
     keys_order: list[str] = []
     max_len = 0
     for entry in entries:
-        undefined.update({key for key in entry if isinstance(key, Undefined)})
-        max_len = max([max_len, *(key + 1 for key in entry if isinstance(key, int))])
-        str_keys = [key for key in entry if isinstance(key, str)]
-        if any(key not in keys_set for key in str_keys):
+        # Single pass per entry, this runs once per row / column of the table
+        str_keys: list[str] = []
+        for key in entry:
+            if isinstance(key, str):
+                str_keys.append(key)
+            elif isinstance(key, int):
+                if key >= max_len:
+                    max_len = key + 1
+            else:
+                undefined.add(key)
+        if not keys_set.issuperset(str_keys):
             keys_order = merge_keys(keys_set, keys_order, str_keys)
             keys_set.update(str_keys)
     return [*undefined, *keys_order, *range(max_len)]
 
 
+LOG10_2 = log10(2)
+POW10 = [10**i for i in range(20)]
+
+
 def integer_digits(v: int | float):
-    if int(abs(v)) == 0:
+    # n has either floor(bits * log10(2)) digits or one more. Exact, unlike log10 which
+    # rounds e.g. 10**18 - 1 up to 18.0, and works for ints too long for str().
+    n = abs(int(v))
+    if n < 10:
         return 1
-    return int(log10(int(abs(v)))) + 1
+    digits = int(n.bit_length() * LOG10_2)
+    return digits + (n >= (POW10[digits] if digits < len(POW10) else 10**digits))
 
 
 class JsonCellFormatter(CellFormatter[TableCell]):
@@ -281,7 +315,7 @@ class JsonCellFormatter(CellFormatter[TableCell]):
                     if isinstance(v, int):
                         region.insstr(
                             pos + pad,
-                            f"{{:d}}".format(v),
+                            str(v),
                             curses.color_pair(curses.COLOR_BLUE) | attr,
                         )
                     else:
@@ -295,7 +329,7 @@ class JsonCellFormatter(CellFormatter[TableCell]):
                         )
                         region.insstr(
                             pos + pad,
-                            f"{{:.{fraction_width}f}}".format(v),
+                            f"{v:.{fraction_width}f}",
                             curses.color_pair(curses.COLOR_BLUE) | attr,
                         )
                     leading_underscores(
@@ -325,6 +359,13 @@ def json_to_table(v: Json) -> Table[int | str | Undefined, TableCell]:
     row_headers = [to_table_cell(r) for r in row_keys]
     col_keys = collect_keys(r.keys() for r in content.values())
     col_headers = [to_table_cell(c) for c in col_keys]
+    # Cells of each column, collected in a single pass over the (possibly sparse) rows
+    col_cells: dict[TableKey, list[TableCell]] = {}
+    for r in content.values():
+        for c, cell in r.items():
+            if (cells := col_cells.get(c)) is None:
+                cells = col_cells[c] = []
+            cells.append(cell)
 
     return Table(
         content,
@@ -335,9 +376,7 @@ def json_to_table(v: Json) -> Table[int | str | Undefined, TableCell]:
         [
             JsonCellFormatter(row_headers),
             *(
-                JsonCellFormatter(
-                    [h, *(r[c] for r in content.values() if c in r)],
-                )
+                JsonCellFormatter([h, *col_cells.get(c, [])])
                 for c, h in zip(col_keys, col_headers)
             ),
         ],
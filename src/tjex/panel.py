@@ -57,6 +57,8 @@ class KeyBindings(Generic[T, S]):
 
 class Panel(ABC):
     active: bool = False
+    # Whether anything that affects draw() has changed since the last redraw
+    dirty: bool = True
 
     @abstractmethod
     def resize(self, region: Region):
@@ -70,5 +72,10 @@ class Panel(ABC):
     def draw(self):
         pass
 
+    def mark_dirty(self):
+        """Redraw this panel in the next frame"""
+        self.dirty = True
+
     def set_active(self, active: bool):
         self.active = active
+        self.mark_dirty()
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 import curses
+from bisect import bisect_left, bisect_right
 from dataclasses import dataclass, replace
+from itertools import accumulate
 from typing import Generic, Self, override
 
 from tjex.config import config
@@ -49,6 +51,7 @@ class TablePanel(Panel, Generic[T_Key, T_Cell]):
     @override
     def resize(self, region: Region):
         self.region = region
+        self.mark_dirty()
         self.row_header_region = OffsetRegion(
             SubRegion(
                 region,
@@ -78,12 +81,16 @@ class TablePanel(Panel, Generic[T_Key, T_Cell]):
 
     def update(self, table: Table[T_Key, T_Cell], state: TableState | None):
         self.table = table
-
-        self.offsets = [0]
-        for formatter in table.col_formatters[1:]:
-            self.offsets.append(
-                self.offsets[-1] + formatter.final_width(self.max_cell_width) + 1
-            )
+        self.mark_dirty()
+
+        max_cell_width = self.max_cell_width
+        self.offsets = [
+            0,
+            *accumulate(
+                formatter.final_width(max_cell_width) + 1
+                for formatter in table.col_formatters[1:]
+            ),
+        ]
 
         if not table.col_formatters:
             return
@@ -110,28 +117,12 @@ class TablePanel(Panel, Generic[T_Key, T_Cell]):
     def draw(self):
         table = self.table
 
+        # offsets are strictly increasing, so the visible columns can be bisected
+        left = self.content_region.offset.x
+        right = left + self.content_region.width
         col_range = range(
-            max(
-                0,
-                next(
-                    (
-                        i
-                        for i, offset in enumerate(self.offsets)
-                        if offset > self.content_region.offset.x
-                    ),
-                    len(self.offsets),
-                )
-                - 1,
-            ),
-            next(
-                (
-                    i
-                    for i, offset in enumerate(self.offsets)
-                    if offset
-                    >= self.content_region.offset.x + self.content_region.width
-                ),
-                len(self.offsets) - 1,
-            ),
+            max(0, bisect_right(self.offsets, left) - 1),
+            min(bisect_left(self.offsets, right), len(self.offsets) - 1),
         )
         row_range = range(
             self.content_region.offset.y,
@@ -311,6 +302,8 @@ class TablePanel(Panel, Generic[T_Key, T_Cell]):
     @override
     def handle_key(self, key: KeyPress) -> list[Event]:
         res = self.bindings.handle_key(key, self)
+        if res is not key:
+            self.mark_dirty()
         if isinstance(res, str):
             return [res]
         self.clamp_cursor()
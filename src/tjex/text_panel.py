@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import curses
-import re
 from collections.abc import Iterable
 from dataclasses import dataclass, field
 from typing import Self, override
@@ -17,13 +16,26 @@ from tjex.point import Point
 class TextPanel(Panel):
     def __init__(self, content: str, clear_first: bool = False):
         self.region: Region = DummyRegion()
-        self.content: str = content
+        self._content: str = content
+        self.lines: list[str] = content.splitlines()
         self.attr: int = 0
         self.clear_first: bool = clear_first
 
+    @property
+    def content(self):
+        return self._content
+
+    @content.setter
+    def content(self, content: str):
+        if content != self._content:
+            self._content = content
+            self.lines = content.splitlines()
+            self.mark_dirty()
+
     @override
     def resize(self, region: Region):
         self.region = region
+        self.mark_dirty()
 
     @override
     def handle_key(self, key: KeyPress):
@@ -34,11 +46,11 @@ class TextPanel(Panel):
         if self.clear_first:
             for i in range(self.region.height):
                 self.region.insstr(Point(i, 0), self.region.width * " ")
-        for i, s in enumerate(self.content.splitlines()):
+        for i, s in enumerate(self.lines):
             self.region.insstr(Point(i, 0), s, self.attr)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class TextEditPanelState:
     content: str
     cursor: int = field(compare=False)
@@ -46,7 +58,11 @@ class TextEditPanelState:
 
 class TextEditPanel(Panel):
     bindings: KeyBindings[Self, None | Event] = KeyBindings()
-    word_char_pattern: re.Pattern[str] = re.compile(r"[0-9a-zA-Z_-]")
+    # Maps each ASCII byte to b"W" for word characters and b"N" otherwise
+    word_char_table: bytes = bytes(
+        ord("W" if chr(i).isascii() and (chr(i).isalnum() or chr(i) in "_-") else "N")
+        for i in range(256)
+    )
 
     def __init__(self, content: str):
         self.region: OffsetRegion = OffsetRegion(DummyRegion(), Point.ZERO)
@@ -56,34 +72,36 @@ class TextEditPanel(Panel):
         self.kill_ring: KillRing = KillRing()
         # If the last command was yank or rotate, the position where that yank started, None otherwise
         self.yank_start: int | None = None
+        # Classification of each character of char_classes_for as word or non-word
+        self.char_classes: bytes = b""
+        self.char_classes_for: str | None = None
 
     @override
     def resize(self, region: Region):
         self.region = OffsetRegion(region, self.region.offset)
+        self.mark_dirty()
+
+    def update_char_classes(self):
+        if self.char_classes_for is not self.content:
+            # Non-ASCII characters become b"?", which is not a word character
+            self.char_classes = self.content.encode("ascii", "replace").translate(
+                self.word_char_table
+            )
+            self.char_classes_for = self.content
 
     def next_word(self):
-        next_cursor = self.cursor
-        while next_cursor < len(self.content) and not self.word_char_pattern.fullmatch(
-            self.content[next_cursor]
-        ):
-            next_cursor += 1
-        while next_cursor < len(self.content) and self.word_char_pattern.fullmatch(
-            self.content[next_cursor]
-        ):
-            next_cursor += 1
-        return next_cursor
+        self.update_char_classes()
+        if (start := self.char_classes.find(b"W", self.cursor)) < 0:
+            return len(self.content)
+        if (end := self.char_classes.find(b"N", start)) < 0:
+            return len(self.content)
+        return end
 
     def prev_word(self):
-        next_cursor = self.cursor - 1
-        while next_cursor >= 0 and not self.word_char_pattern.fullmatch(
-            self.content[next_cursor]
-        ):
-            next_cursor -= 1
-        while next_cursor >= 0 and self.word_char_pattern.fullmatch(
-            self.content[next_cursor]
-        ):
-            next_cursor -= 1
-        return next_cursor + 1
+        self.update_char_classes()
+        if (end := self.char_classes.rfind(b"W", 0, self.cursor)) < 0:
+            return 0
+        return self.char_classes.rfind(b"N", 0, end) + 1
 
     def delete(self, until: int, kill: bool = False):
         until = max(0, min(until, len(self.content)))
@@ -217,16 +235,19 @@ class TextEditPanel(Panel):
     def set_cursor(self, cursor: int):
         self.cursor = max(0, min(len(self.content), cursor))
         self.update_content_base()
+        self.mark_dirty()
 
     def update_content_base(self):
-        if self.cursor < self.region.offset.x:
-            self.region.offset = Point(0, self.cursor)
-        if self.cursor >= self.region.offset.x + self.region.width:
-            self.region.offset = Point(0, self.cursor - self.region.width + 1)
-        if len(self.content) < self.region.offset.x + self.region.width:
-            self.region.offset = Point(
-                0, max(0, len(self.content) - self.region.width + 1)
-            )
+        base = self.region.offset.x
+        width = self.region.width
+        if self.cursor < base:
+            base = self.cursor
+        if self.cursor >= base + width:
+            base = self.cursor - width + 1
+        if len(self.content) < base + width:
+            base = max(0, len(self.content) - width + 1)
+        if base != self.region.offset.x:
+            self.region.offset = Point(0, base)
 
     @override
     def draw(self):
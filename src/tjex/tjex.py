@@ -3,15 +3,16 @@ from __future__ import annotations
 
 import argparse
 import curses
-import json
 import os
 import shlex
 import subprocess as sp
 import sys
 import time
+from collections import OrderedDict
 from dataclasses import dataclass
+from functools import cache
 from importlib.metadata import version
-from multiprocessing import set_start_method
+from multiprocessing import set_forkserver_preload, set_start_method
 from pathlib import Path
 from typing import Any, Callable
 
@@ -26,6 +27,7 @@ from tjex.jq import (
     JqResult,
     append_filter,
     append_selector,
+    key_to_json,
     key_to_selector,
     keys_to_selector,
     standalone_selector,
@@ -36,10 +38,12 @@ from tjex.panel import Event, KeyBindings, KeyPress, Panel, StatusUpdate
 from tjex.point import Point
 from tjex.table_panel import TablePanel, TableState
 from tjex.text_panel import TextEditPanel, TextPanel
-from tjex.utils import TjexError, TmpFiles
+from tjex.utils import TjexError, TmpFiles, shell_args
 
 
-def append_history(jq_cmd: str) -> StatusUpdate:
+@cache
+def history_prefix() -> str:
+    """The current tjex call without its --command argument, quoted for the shell"""
     skip = False
     cmd: list[str] = ["tjex"]
     for arg in sys.argv[1:]:
@@ -52,16 +56,15 @@ def append_history(jq_cmd: str) -> StatusUpdate:
                 pass
             else:
                 cmd.append(arg)
-    cmd += ["--command", jq_cmd]
-    cmd_str = " ".join(shlex.quote(arg) for arg in cmd)
+    return shlex.join(cmd)
+
+
+def append_history(jq_cmd: str) -> StatusUpdate:
+    cmd_str = f"{history_prefix()} --command {shlex.quote(jq_cmd)}"
 
     logger.debug(f"Trying to add to atuin history: {cmd_str}")
     result = sp.run(
-        [
-            "bash",
-            "-c",
-            loaded_config.append_history_command.format(shlex.quote(cmd_str)),
-        ],
+        shell_args(loaded_config.append_history_command.format(shlex.quote(cmd_str))),
         capture_output=True,
     )
     if result.returncode:
@@ -75,6 +78,15 @@ class Quit(Event):
 
 
 class Tjex:
+    # Upper bound for waiting on input. Terminal resizes are only noticed after this.
+    idle_timeout: float = 0.05
+    # While typing in the prompt, jq is only started after this many seconds without a key
+    typing_debounce: float = 0.08
+    # Number of commands for which the table cursor position is remembered
+    table_cursor_history_size: int = 256
+    # Pending keys are handled before redrawing, but at most this many per frame
+    max_keys_per_frame: int = 64
+
     def __init__(
         self,
         screen: Region,
@@ -103,11 +115,13 @@ class Tjex:
         ]
 
         self.active_cycle: list[Panel] = [self.table, self.prompt]
+        # Region each panel was last resized to
+        self.panel_regions: dict[Panel, SubRegion] = {}
 
         self.jq: Jq = Jq(file, slurp)
 
         self.current_command: str = command
-        self.table_cursor_history: dict[str, TableState] = {}
+        self.table_cursor_history: OrderedDict[str, TableState] = OrderedDict()
 
         self.bindings: KeyBindings[None, Event | None] = KeyBindings()
 
@@ -119,6 +133,7 @@ class Tjex:
         def toggle_active(_: None):  # pyright: ignore[reportUnusedFunction]
             """Toggle active panel between prompt and table"""
             if self.active_cycle[0] == self.prompt:
+                self.jq.update(self.prompt.content)
                 self.update_jq_status(
                     block=True
                 )  # pyright: ignore[reportUnusedCallResult]
@@ -146,7 +161,7 @@ class Tjex:
         @self.table.bindings.add("M-w")
         def copy_content(_: Any):  # pyright: ignore[reportUnusedFunction]
             """Copy output of current command to clipboard"""
-            loaded_config.do_copy(json.dumps(self.jq.run_plain(), ensure_ascii=False))
+            loaded_config.do_copy(self.jq.run_plain(self.prompt.content))
             return StatusUpdate("Copied.")
 
         @self.table.bindings.add("\n")
@@ -172,36 +187,33 @@ class Tjex:
             """Copy content of the current cell to clipboard.
             If content is a string, copy the plain value, not the json representation.
             """
-            content = self.jq.run_plain(
-                append_selector(
-                    self.jq.command or ".",
-                    keys_to_selector(*self.table.cell_keys) or "",
+            loaded_config.do_copy(
+                self.jq.run_plain(
+                    append_selector(
+                        self.prompt.content or ".",
+                        keys_to_selector(*self.table.cell_keys) or "",
+                    ),
+                    raw=True,
                 )
             )
-            if isinstance(content, str):
-                loaded_config.do_copy(content)
-            else:
-                loaded_config.do_copy(json.dumps(content, ensure_ascii=False))
             return StatusUpdate("Copied.")
 
         @self.table.bindings.add("E")
         def expand_row(_: Any):  # pyright: ignore[reportUnusedFunction]
             """Expand the selected row"""
             key = self.table.row_key
-            if key == Undefined():
+            if isinstance(key, Undefined):
                 raise TjexError("Not an array or object")
-            self.prompt_append(
-                f"expand({json.dumps(key, ensure_ascii=False)})", self.table.state
-            )
+            self.prompt_append(f"expand({key_to_json(key)})", self.table.state)
 
         @self.table.bindings.add("e")
         def expand_col(_: Any):  # pyright: ignore[reportUnusedFunction]
             """Expand the selected column"""
             key = self.table.col_key
-            if key == Undefined():
+            if isinstance(key, Undefined):
                 raise TjexError("Not an array or object")
             self.prompt_append(
-                f"map_values(expand({json.dumps(key, ensure_ascii=False)}))",
+                f"map_values(expand({key_to_json(key)}))",
                 self.table.state,
             )
 
@@ -209,7 +221,7 @@ class Tjex:
         def delete_row(_: Any):  # pyright: ignore[reportUnusedFunction]
             """Delete the selected row"""
             key = self.table.row_key
-            if key == Undefined():
+            if isinstance(key, Undefined):
                 raise TjexError("Not an array or object")
             self.prompt_append(
                 f"del({standalone_selector(key_to_selector(key))})", self.table.state
@@ -219,7 +231,7 @@ class Tjex:
         def delete_col(_: Any):  # pyright: ignore[reportUnusedFunction]
             """Delete the selected column"""
             key = self.table.col_key
-            if key == Undefined():
+            if isinstance(key, Undefined):
                 raise TjexError("Not an array or object")
             self.prompt_append(
                 f"map_values(del({standalone_selector(key_to_selector(key))}))",
@@ -230,7 +242,7 @@ class Tjex:
         def select_col(_: Any):  # pyright: ignore[reportUnusedFunction]
             """Enter the selected column"""
             key = self.table.col_key
-            if key == Undefined():
+            if isinstance(key, Undefined):
                 raise TjexError("Not an array or object")
             self.prompt_append(
                 f"map_values({standalone_selector(key_to_selector(key))})",
@@ -245,7 +257,7 @@ class Tjex:
             if not isinstance(self.table.row_key, int):
                 raise TjexError("Not an array")
             key = self.table.col_key
-            if key == Undefined():
+            if isinstance(key, Undefined):
                 self.prompt.update(append_filter(self.prompt.content, f"sort"))
             else:
                 self.prompt_append(
@@ -269,47 +281,54 @@ class Tjex:
             }
         )
 
+    def resize_panel(self, panel: Panel, region: SubRegion):
+        """Resize panel unless its region is unchanged"""
+        if self.panel_regions.get(panel) != region:
+            self.panel_regions[panel] = region
+            panel.resize(region)
+
     def resize(self, status_detail_height: None | int = None):
         status_height = 1
         self.screen.resize()
         size = self.screen.size
-        self.table.resize(SubRegion(self.screen, Point(0, 0), size - Point(3, 0)))
-        self.prompt_head.resize(
-            SubRegion(self.screen, Point(size.y - status_height - 1, 0), Point(1, 2))
+        prompt_y = size.y - status_height - 1
+        self.resize_panel(
+            self.table, SubRegion(self.screen, Point.ZERO, Point(size.y - 3, size.x))
         )
-        self.prompt.resize(
-            SubRegion(
-                self.screen,
-                Point(size.y - status_height - 1, 2),
-                Point(1, size.x - 2),
-            )
+        self.resize_panel(
+            self.prompt_head,
+            SubRegion(self.screen, Point(prompt_y, 0), Point(1, 2)),
+        )
+        self.resize_panel(
+            self.prompt,
+            SubRegion(self.screen, Point(prompt_y, 2), Point(1, size.x - 2)),
         )
-        self.status.resize(
+        self.resize_panel(
+            self.status,
             SubRegion(
                 self.screen,
                 Point(size.y - status_height, 0),
                 Point(status_height, size.x),
-            )
+            ),
         )
         if status_detail_height is None:
             status_detail_height = self.status_detail_region.height
-        status_detail_region = SubRegion(
+        self.status_detail_region = SubRegion(
             self.screen,
-            Point(size.y - status_height - 1 - status_detail_height, 0),
+            Point(prompt_y - status_detail_height, 0),
             Point(status_detail_height, size.x),
         )
-        self.status_detail.resize(status_detail_region)
+        self.resize_panel(self.status_detail, self.status_detail_region)
 
     def set_status(self, msg: str):
         logger.debug(msg)
         lines = msg.splitlines()
         self.status.content = "\n".join(lines[:1])
-        if len(lines) <= 1:
-            self.resize(status_detail_height=0)
-            self.status_detail.content = ""
-        else:
-            self.resize(status_detail_height=len(lines))
-            self.status_detail.content = "\n".join(lines)
+        detail_height = len(lines) if len(lines) > 1 else 0
+        # Most messages don't change the layout, skip recomputing it
+        if detail_height != self.status_detail_region.height:
+            self.resize(status_detail_height=detail_height)
+        self.status_detail.content = "\n".join(lines) if detail_height else ""
 
     def update_jq_status(self, block: bool = False):
         match self.jq.status(block):
@@ -320,7 +339,7 @@ class Tjex:
                 else:
                     self.set_status(msg)
                 if content is not None and self.jq.command is not None:
-                    self.table_cursor_history[self.current_command] = self.table.state
+                    self.remember_table_cursor(self.current_command, self.table.state)
                     self.current_command = self.jq.command
                     self.table.update(
                         content, self.table_cursor_history.get(self.current_command)
@@ -329,10 +348,16 @@ class Tjex:
             case _:
                 return False
 
+    def remember_table_cursor(self, command: str, state: TableState):
+        self.table_cursor_history[command] = state
+        self.table_cursor_history.move_to_end(command)
+        if len(self.table_cursor_history) > self.table_cursor_history_size:
+            _ = self.table_cursor_history.popitem(last=False)
+
     def prompt_append(self, command: str, cursor: TableState | None = None):
         new_prompt = append_filter(self.prompt.content, command)
         if cursor is not None:
-            self.table_cursor_history[new_prompt] = cursor
+            self.remember_table_cursor(new_prompt, cursor)
         self.prompt.update(new_prompt)
 
     def run(
@@ -340,6 +365,7 @@ class Tjex:
         key_reader: Callable[[], str | None],
         screen_erase: Callable[[], None],
         screen_refresh: Callable[[], None],
+        wait: Callable[[list[int], float], None] = curses_helper.wait_readable,
     ) -> int:
         self.resize()
         self.active_cycle = [self.table, self.prompt]
@@ -347,11 +373,14 @@ class Tjex:
             self.active_cycle = [self.prompt, self.table]
         self.active_cycle[0].set_active(True)
         self.jq.update(self.prompt.content)
-
-        redraw = True
+        # Time at which the prompt content is handed to jq
+        jq_due = 0.0
+        keys_since_draw = 0
 
         while True:
             if (key := key_reader()) is not None:
+                if self.active_cycle[0] == self.prompt:
+                    jq_due = time.monotonic() + self.typing_debounce
                 try:
                     for event in self.active_cycle[0].handle_key(KeyPress(key)):
                         match self.bindings.handle_key(event, None):
@@ -365,23 +394,32 @@ class Tjex:
                                 pass
                 except TjexError as e:
                     self.set_status(e.msg)
+                keys_since_draw += 1
+                if keys_since_draw < self.max_keys_per_frame:
+                    continue
+
+            # Only start jq once all pending keys (e.g. from a paste) are handled
+            timeout = self.idle_timeout
+            if (jq_delay := jq_due - time.monotonic()) > 0:
+                timeout = min(timeout, jq_delay)
+            else:
                 self.jq.update(self.prompt.content)
-                redraw = True
-                continue
-
-            if self.update_jq_status() or redraw:
+            _ = self.update_jq_status()
+            if any(panel.dirty for panel in self.panels):
                 screen_erase()
                 for panel in self.panels:
                     panel.draw()
+                    panel.dirty = False
                 screen_refresh()
-                redraw = False
-                continue
+            keys_since_draw = 0
 
-            time.sleep(0.01)
+            wait(self.jq.wait_fds(), timeout)
 
 
 def main():
     set_start_method("forkserver")
+    # Import tjex once in the fork server, instead of again in every jq worker
+    set_forkserver_preload(["tjex.tjex"])
     parser = argparse.ArgumentParser(description="A tabular json explorer.")
     _ = parser.add_argument("--version", action="version", version=version("tjex"))
     _ = parser.add_argument("file", type=Path, nargs="*")
@@ -401,12 +439,13 @@ def main():
         if args.null_input:
             args.file = [tmpfile("null")]
         if not args.file:
-            args.file = [tmpfile(sys.stdin.read())]
+            args.file = [tmpfile(sys.stdin.buffer)]
             os.close(0)
             sys.stdin = open("/dev/tty")
         for i in range(len(args.file)):
             if not args.file[i].is_file():
-                args.file[i] = tmpfile(args.file[i].read_text())
+                with args.file[i].open("rb") as f:
+                    args.file[i] = tmpfile(f)
 
         @curses.wrapper
         def result(scr: curses.window):
@@ -421,7 +460,13 @@ def main():
             load_config_file(args.config, tjex_main.bindings_list())
             if args.max_cell_width:
                 loaded_config.max_cell_width = args.max_cell_width
-            return tjex_main.run(KeyReader(scr).get, scr.erase, scr.refresh)
+            key_reader = KeyReader(scr)
+            return tjex_main.run(
+                key_reader.get,
+                scr.erase,
+                lambda: curses_helper.synchronized_refresh(scr),
+                key_reader.wait,
+            )
 
     return result
 
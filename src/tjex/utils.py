@@ -1,6 +1,11 @@
+import re
+import shlex
+import shutil
 from contextlib import ExitStack, contextmanager
+from functools import cache
 from pathlib import Path
 from tempfile import NamedTemporaryFile
+from typing import BinaryIO
 
 
 class TjexError(Exception):
@@ -9,15 +14,65 @@ class TjexError(Exception):
         self.msg: str = msg
 
 
+# Anything but words, spaces, tabs, quotes and a few harmless punctuation characters.
+# Newlines separate commands in bash, so they count as shell syntax.
+shell_syntax_pattern = re.compile(r"""[^\w \t'"@%+=:,./-]""")
+
+
+# Commands bash runs itself instead of looking them up in PATH
+# (compgen -b and compgen -k)
+bash_builtins = frozenset("""
+    . : [ alias bg bind break builtin caller cd command compgen complete compopt
+    continue declare dirs disown echo enable eval exec exit export false fc fg getopts
+    hash help history jobs kill let local logout mapfile popd printf pushd pwd read
+    readarray readonly return set shift shopt source suspend test times trap true type
+    typeset ulimit umask unalias unset wait
+    if then else elif fi case esac for select while until do done in function time
+    { } ! [[ ]] coproc
+    """.split())
+
+
+@cache
+def executable(name: str) -> str | None:
+    """Path of the program bash would run for name.
+    None for builtins and keywords, and for names not found in PATH.
+    """
+    if name in bash_builtins:
+        return None
+    return shutil.which(name)
+
+
+def shell_args(command: str) -> list[str]:
+    """Arguments to run command as bash would.
+    Plain commands without any shell syntax are run directly, everything else via bash.
+    """
+    if shell_syntax_pattern.search(command) is None:
+        try:
+            args = shlex.split(command)
+        except ValueError:
+            args = []
+        # A leading "VAR=value" is an environment assignment in bash, and commands
+        # that aren't executables (e.g. builtins) need bash, too.
+        if args and "=" not in args[0] and (path := executable(args[0])) is not None:
+            return [path, *args[1:]]
+    return ["bash", "-c", command]
+
+
 @contextmanager
 def TmpFiles():
     with ExitStack() as stack:
 
-        def tmpfile(s: str):
+        def tmpfile(content: str | BinaryIO):
+            """Write content to a new temporary file.
+            File objects are copied chunk-wise without reading them into memory.
+            """
             buffered = stack.enter_context(
-                NamedTemporaryFile(mode="w", delete_on_close=False, delete=True)
+                NamedTemporaryFile(mode="wb", delete_on_close=False, delete=True)
             )
-            _ = buffered.write(s)
+            if isinstance(content, str):
+                _ = buffered.write(content.encode())
+            else:
+                shutil.copyfileobj(content, buffered)
             buffered.close()
             return Path(buffered.name)
 
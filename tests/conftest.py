@@ -0,0 +1,8 @@
+from multiprocessing import set_start_method
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def fork_server():
+    set_start_method("forkserver")
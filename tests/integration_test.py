@@ -136,11 +136,6 @@ def run_case(path: Path, update: bool):
             _ = f.write("\n")
 
 
-@pytest.fixture(scope="session")
-def fork_server():
-    set_start_method("forkserver")
-
-
 @pytest.mark.parametrize("path", case_paths(), ids=case_name)
 def test_integration(
     path: Path, fork_server: None  # pyright: ignore[reportUnusedParameter]
@@ -0,0 +1,34 @@
+from typing import Any
+
+import pytest
+
+import tjex.config as tjex_config
+from tjex.config import ConfigError, load
+from tjex.panel import KeyBindings
+
+
+@pytest.fixture
+def bindings():
+    for k, v in vars(tjex_config.Config()).items():
+        setattr(tjex_config.config, k, v)
+    table: KeyBindings[Any, Any] = KeyBindings()
+
+    @table.add("a")
+    def known(_: Any):  # pyright: ignore[reportUnusedFunction]
+        pass
+
+    yield {"table": table}
+    for k, v in vars(tjex_config.Config()).items():
+        setattr(tjex_config.config, k, v)
+
+
+def test_bindings(bindings: dict[str, KeyBindings[Any, Any]]):
+    load({"bindings": {"table": {"b": "known"}}}, bindings)
+    assert bindings["table"].bindings["b"].name == "known"
+
+
+def test_unknown_binding(bindings: dict[str, KeyBindings[Any, Any]]):
+    with pytest.raises(
+        ConfigError, match="Unknown function 'unknown' in bindings.table"
+    ):
+        load({"bindings": {"table": {"b": "unknown"}}}, bindings)
@@ -0,0 +1,109 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from tjex.jq import Jq, JqResult, key_to_json
+
+
+def run(jq: Jq, command: str) -> tuple[bool, JqResult | None]:
+    """Update jq to command and wait for its result.
+    Returns whether jq was actually run.
+    """
+    jq.update(command)
+    started = jq.process is not None
+    return started, jq.status(block=True)
+
+
+@pytest.fixture
+def input_file(
+    tmp_path: Path, fork_server: None  # pyright: ignore[reportUnusedParameter]
+):
+    path = tmp_path / "input.json"
+    _ = path.write_text('{"a": 1, "b": 2, "s": "x y"}')
+    return path
+
+
+def test_result_cache_hit(input_file: Path):
+    jq = Jq([input_file], False)
+    started, first = run(jq, ".a")
+    assert started
+    assert first is not None and first.table is not None
+    assert run(jq, ".b")[0]
+    assert run(jq, ".a") == (False, first)
+
+
+def test_result_cache_eviction(input_file: Path):
+    jq = Jq([input_file], False)
+    jq.result_cache_size = 2
+    for command in [".a", ".b", "."]:
+        assert run(jq, command)[0]
+    assert not run(jq, ".b")[0]
+    assert run(jq, ".a")[0]
+
+
+def test_result_cache_invalidation(input_file: Path):
+    jq = Jq([input_file], False)
+    assert run(jq, ".a")[0]
+    assert run(jq, ".b")[0]
+    _ = input_file.write_text('{"a": 10}')
+    started, result = run(jq, ".a")
+    assert started
+    assert result is not None and result.table is not None
+
+
+@pytest.mark.parametrize("command", ['error("x")', "now"])
+def test_result_cache_skip(input_file: Path, command: str):
+    jq = Jq([input_file], False)
+    assert run(jq, command)[0]
+    assert run(jq, ".a")[0]
+    assert run(jq, command)[0]
+
+
+def test_run_plain_format(input_file: Path):
+    jq = Jq([input_file], False)
+    assert jq.run_plain(".") == '{"a": 1, "b": 2, "s": "x y"}'
+    assert jq.run_plain("[.a, .b]") == "[1, 2]"
+
+
+@pytest.mark.parametrize(
+    "command,raw,expected",
+    [
+        (".s", False, '"x y"'),
+        (".s", True, "x y"),
+        (".a", False, "1"),
+        (".a", True, "1"),
+        ("[.s]", True, '["x y"]'),
+    ],
+)
+def test_run_plain_raw(input_file: Path, command: str, raw: bool, expected: str):
+    jq = Jq([input_file], False)
+    assert jq.run_plain(command, raw) == expected
+
+
+def test_run_plain_reruns(input_file: Path):
+    jq = Jq([input_file], False)
+    assert jq.run_plain("now") != jq.run_plain("now")
+
+
+@pytest.mark.parametrize(
+    "key",
+    [
+        0,
+        -12,
+        1 << 100,
+        "",
+        "abc",
+        "a b",
+        'a"b',
+        "a\\b",
+        "a\nb",
+        "\x00\x1f\x7f",
+        "é x",
+        "日本",
+        "\u2028",
+        "\ud800",
+    ],
+)
+def test_key_to_json(key: str | int):
+    assert key_to_json(key) == json.dumps(key, ensure_ascii=False)
@@ -25,6 +25,7 @@ def cell_to_string(
         (50, [100.0], ["100.00000"], 9, 5),
         (50, [-0.01, 0.01], ["-0.0100000", " 0.0100000"], 10, 4),
         (4, [100000], ["100000"], 6, 6),
+        (50, [10**18 - 1], ["999999999999999999"], 18, 7),
         (4, [10000000], ["1.0e+07"], 8, 7),
         (4, [10000000, -10000000], [" 1.0e+07", "-1.0e+07"], 9, 8),
         (50, [1 << 100000], ["9.99002093e+30102"], 30103, 10),
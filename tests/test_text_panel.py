@@ -0,0 +1,26 @@
+import pytest
+
+from tjex.text_panel import TextEditPanel
+
+
+@pytest.mark.parametrize(
+    "content,cursor,next_word,prev_word",
+    [
+        ("", 0, 0, 0),
+        ("foo", 0, 3, 0),
+        ("foo", 3, 3, 0),
+        (".foo | .bar", 0, 4, 0),
+        (".foo | .bar", 2, 4, 1),
+        (".foo | .bar", 4, 11, 1),
+        (".foo | .bar", 8, 11, 1),
+        (".foo | .bar", 9, 11, 8),
+        (".foo | .bar ", 11, 12, 8),
+        ('.["é x"]', 0, 6, 0),
+        ('.["é x"]', 6, 8, 5),
+    ],
+)
+def test_word_motion(content: str, cursor: int, next_word: int, prev_word: int):
+    panel = TextEditPanel(content)
+    panel.cursor = cursor
+    assert panel.next_word() == next_word
+    assert panel.prev_word() == prev_word
@@ -0,0 +1,21 @@
+import shutil
+
+import pytest
+
+from tjex.utils import shell_args
+
+
+@pytest.mark.parametrize(
+    "command,expected",
+    [
+        ("cat one 'two three'", [shutil.which("cat"), "one", "two three"]),
+        ("echo hi", ["bash", "-c", "echo hi"]),
+        ("time cat", ["bash", "-c", "time cat"]),
+        ("FOO=x echo one", ["bash", "-c", "FOO=x echo one"]),
+        ("source file", ["bash", "-c", "source file"]),
+        ("echo $(date)", ["bash", "-c", "echo $(date)"]),
+        ("echo one\necho two", ["bash", "-c", "echo one\necho two"]),
+    ],
+)
+def test_shell_args(command: str, expected: list[str]):
+    assert shell_args(command) == expected